@@ -1,20 +1,24 @@
-from flask import Flask, jsonify, request, render_template
+from flask import Flask, Response, jsonify, request, render_template
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, select, update
 from sqlalchemy.exc import IntegrityError
-from database import db
+from database import db, set_sqlite_pragmas
 from models import Flight, Booking
+from schemas import FLIGHTS_ADAPTER, BOOKINGS_ADAPTER
 from utils import generate_pnr
 
 app = Flask(__name__)
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///booking.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db.init_app(app)
+with app.app_context():
+    event.listen(db.engine, "connect", set_sqlite_pragmas)
 
 
-@app.before_first_request
-def create_tables():
+def init_db():
+    """Create tables and seed sample flights into an empty DB. Safe to run more than once."""
     db.create_all()
-    if Flight.query.count() == 0:
+    if db.session.execute(select(Flight.id).limit(1)).first() is None:
         sample_flights = [
             Flight("AI101", "Delhi", "Mumbai", "2025-11-10 09:00", 100, 4500),
             Flight("AI202", "Chennai", "Delhi", "2025-11-10 14:00", 80, 5200),
@@ -41,21 +45,21 @@ def history_page():
 def get_flights():
     src = request.args.get('source')
     dst = request.args.get('destination')
-    query = Flight.query
+    stmt = select(
+        Flight.id,
+        Flight.flight_number,
+        Flight.source,
+        Flight.destination,
+        Flight.departure_time,
+        Flight.available_seats,
+        Flight.price
+    )
     if src:
-        query = query.filter_by(source=src)
+        stmt = stmt.where(Flight.source == src)
     if dst:
-        query = query.filter_by(destination=dst)
-    flights = query.all()
-    return jsonify([{
-        'id': f.id,
-        'flight_number': f.flight_number,
-        'source': f.source,
-        'destination': f.destination,
-        'departure_time': f.departure_time,
-        'available_seats': f.available_seats,
-        'price': f.price
-    } for f in flights])
+        stmt = stmt.where(Flight.destination == dst)
+    rows = db.session.execute(stmt).mappings().all()
+    return Response(FLIGHTS_ADAPTER.dump_json([dict(r) for r in rows]), mimetype='application/json')
 
 @app.route('/api/book', methods=['POST'])
 def book_flight():
@@ -63,19 +67,26 @@ def book_flight():
     passenger = data.get('passenger_name')
     flight_id = data.get('flight_id')
     seats = data.get('seats', 1)
-    flight = Flight.query.get(flight_id)
-    if not flight:
-        return jsonify({'error': 'Flight not found'}), 404
-    if flight.available_seats < seats:
-        return jsonify({'error': 'Not enough seats available'}), 400
     try:
-        flight.available_seats -= seats
+        # check, decrement and read the price in one statement so concurrent bookings can't oversell
+        price = db.session.execute(
+            update(Flight)
+            .where(Flight.id == flight_id, Flight.available_seats >= seats)
+            .values(available_seats=Flight.available_seats - seats)
+            .returning(Flight.price)
+        ).scalar_one_or_none()
+        if price is None:
+            db.session.rollback()
+            if db.session.get(Flight, flight_id) is None:
+                return jsonify({'error': 'Flight not found'}), 404
+            return jsonify({'error': 'Not enough seats available'}), 400
         pnr = generate_pnr()
-        total = flight.price * seats
+        # RETURNING hands back whole-number REALs as int; keep total_amount a float as before
+        total = float(price) * seats
         booking = Booking(
             pnr=pnr,
             passenger_name=passenger,
-            flight_id=flight.id,
+            flight_id=flight_id,
             seats_booked=seats,
             total_amount=total,
             status="CONFIRMED"
@@ -89,29 +100,45 @@ def book_flight():
 
 @app.route('/api/cancel/<pnr>', methods=['POST'])
 def cancel_booking(pnr):
-    booking = Booking.query.filter_by(pnr=pnr).first()
+    booking = db.session.execute(
+        select(Booking.flight_id, Booking.seats_booked, Booking.status).where(Booking.pnr == pnr)
+    ).first()
     if not booking:
         return jsonify({'error': 'Invalid PNR'}), 404
     if booking.status == 'CANCELLED':
         return jsonify({'message': 'Already cancelled'})
-    booking.status = 'CANCELLED'
-    flight = Flight.query.get(booking.flight_id)
-    flight.available_seats += booking.seats_booked
+    # flip the status only if nobody cancelled it in the meantime, so seats are returned once
+    result = db.session.execute(
+        update(Booking)
+        .where(Booking.pnr == pnr, Booking.status != 'CANCELLED')
+        .values(status='CANCELLED')
+    )
+    if result.rowcount == 0:
+        db.session.rollback()
+        return jsonify({'message': 'Already cancelled'})
+    db.session.execute(
+        update(Flight)
+        .where(Flight.id == booking.flight_id)
+        .values(available_seats=Flight.available_seats + booking.seats_booked)
+    )
     db.session.commit()
     return jsonify({'message': 'Booking cancelled successfully', 'pnr': pnr})
 
 @app.route('/api/bookings', methods=['GET'])
 def booking_history():
-    all_bookings = Booking.query.all()
-    return jsonify([{
-        'pnr': b.pnr,
-        'passenger_name': b.passenger_name,
-        'flight_id': b.flight_id,
-        'seats_booked': b.seats_booked,
-        'total_amount': b.total_amount,
-        'status': b.status,
-        'created_at': b.created_at.strftime('%Y-%m-%d %H:%M')
-    } for b in all_bookings])
+    rows = db.session.execute(select(
+        Booking.pnr,
+        Booking.passenger_name,
+        Booking.flight_id,
+        Booking.seats_booked,
+        Booking.total_amount,
+        Booking.status,
+        Booking.created_at
+    )).mappings().all()
+    return Response(BOOKINGS_ADAPTER.dump_json([dict(r) for r in rows]), mimetype='application/json')
+
+with app.app_context():
+    init_db()
 
 if __name__ == '__main__':
     app.run(debug=True)
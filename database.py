@@ -1,3 +1,19 @@
 from flask_sqlalchemy import SQLAlchemy
 
 db = SQLAlchemy()
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune every new SQLite connection: WAL so readers don't block the writer,
+    NORMAL sync (safe under WAL), a busy timeout instead of 'database is locked',
+    and a bigger page cache / mmap window.
+    WAL mode leaves booking.db-wal and booking.db-shm files next to the database.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=10000")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.close()
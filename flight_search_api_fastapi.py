@@ -13,8 +13,9 @@ Features implemented:
 How to run:
 1. python -m venv venv
 2. source venv/bin/activate   # (on Windows: venv\Scripts\activate)
-3. pip install fastapi uvicorn sqlmodel[sqlite] pydantic
-4. uvicorn flight_search_api_fastapi:app --reload
+3. pip install fastapi uvicorn sqlmodel[sqlite] pydantic numpy orjson
+4. SEED_SAMPLE_DATA=1 uvicorn flight_search_api_fastapi:app --reload
+   (SEED_SAMPLE_DATA=1 seeds sample flights into an empty DB on startup; it is off by default)
 
 Endpoints (examples):
 - GET /flights
@@ -24,14 +25,20 @@ Endpoints (examples):
 
 """
 from datetime import datetime, timedelta, date
-import threading
-import time
+import asyncio
+import os
+import queue
 import random
+from bisect import bisect_right
 import uuid
-from typing import Optional, List, Literal
+from typing import Optional, List, Literal, Tuple
 
+import numpy as np
 from fastapi import FastAPI, HTTPException, Query
-from pydantic import BaseModel, Field, conint
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ConfigDict, Field, conint
+from sqlalchemy import Index, event
+from sqlalchemy.pool import QueuePool
 from sqlmodel import SQLModel, Field as ORMField, create_engine, Session, select
 
 # -------------------------------
@@ -40,15 +47,23 @@ from sqlmodel import SQLModel, Field as ORMField, create_engine, Session, select
 DB_FILE = "sqlite:///./flights.db"
 ENABLE_FARE_HISTORY = True  # set False to skip storing history
 BACKGROUND_UPDATE_INTERVAL_SEC = 10  # how often background simulation runs (seconds)
+SEED_SAMPLE_DATA = os.getenv("SEED_SAMPLE_DATA", "0") == "1"  # seed an empty DB on startup (dev only)
 
 # -------------------------------
 # Database models
 # -------------------------------
 class Flight(SQLModel, table=True):
+    # composite indexes matching the /search predicate (equality columns first, then the date range)
+    # and the route + price ordering used by sort_by=price
+    __table_args__ = (
+        Index("ix_flight_search", "origin", "destination", "departure"),
+        Index("ix_flight_route_fare", "origin", "destination", "current_fare"),
+    )
+
     id: Optional[int] = ORMField(default=None, primary_key=True)
     flight_code: str = ORMField(index=True)
     airline: str
-    origin: str = ORMField(index=True)
+    origin: str
     destination: str = ORMField(index=True)
     departure: datetime = ORMField(index=True)
     arrival: datetime
@@ -60,8 +75,11 @@ class Flight(SQLModel, table=True):
     demand_level: int  # 0..100
 
 class FareHistory(SQLModel, table=True):
+    # serves /fare-history/{flight_id} ordered by timestamp without a separate sort
+    __table_args__ = (Index("ix_fare_hist_flight_ts", "flight_id", "timestamp"),)
+
     id: Optional[int] = ORMField(default=None, primary_key=True)
-    flight_id: int = ORMField(index=True)
+    flight_id: int
     timestamp: datetime
     fare: float
 
@@ -69,6 +87,9 @@ class FareHistory(SQLModel, table=True):
 # Pydantic models (responses / requests)
 # -------------------------------
 class FlightOut(BaseModel):
+    # read straight from Flight instances instead of going through .dict()
+    model_config = ConfigDict(from_attributes=True)
+
     flight_code: str
     airline: str
     origin: str
@@ -82,6 +103,13 @@ class FlightOut(BaseModel):
     current_fare: float
     demand_level: int
 
+# Flight columns backing FlightOut, for projection-only selects
+FLIGHT_OUT_COLUMNS = (
+    Flight.flight_code, Flight.airline, Flight.origin, Flight.destination,
+    Flight.departure, Flight.arrival, Flight.duration_mins, Flight.seats_total,
+    Flight.seats_available, Flight.base_fare, Flight.current_fare, Flight.demand_level,
+)
+
 class ExternalFlightRequest(BaseModel):
     airlines: List[str] = Field(default_factory=lambda: ["AirFast", "SkyLine", "CloudAir"])
     routes: List[List[str]] = Field(default_factory=lambda: [["DEL","BOM"],["DEL","BLR"],["BLR","BOM"]])
@@ -91,7 +119,30 @@ class ExternalFlightRequest(BaseModel):
 # App and DB init
 # -------------------------------
 app = FastAPI(title="Flight Search & Dynamic Pricing API")
-engine = create_engine(DB_FILE, echo=False)
+# Keep a pool of open SQLite connections. Requests and background ticks run on different
+# threads, so connections must be allowed to move between threads.
+engine = create_engine(
+    DB_FILE,
+    echo=False,
+    connect_args={"check_same_thread": False},
+    poolclass=QueuePool,
+    pool_size=10,
+    max_overflow=20,
+)
+
+@event.listens_for(engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Applied to each new SQLite connection. WAL lets the background worker write
+    while requests read; it leaves flights.db-wal and flights.db-shm sidecar files.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=10000")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.close()
 
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
@@ -102,6 +153,13 @@ create_db_and_tables()
 # Utility: dynamic pricing engine
 # -------------------------------
 
+# Tier tables shared by the scalar and vectorized pricing paths.
+# A value below BUCKETS[i] (and not below BUCKETS[i-1]) gets MULTS[i]; at or above the last bucket it gets MULTS[-1].
+SEAT_BUCKETS = (0.05, 0.15, 0.33, 0.5)      # remaining seat fraction
+SEAT_MULTS = (1.0, 0.5, 0.25, 0.1, 0.0)     # +100%, +50%, +25%, +10%, none
+HOUR_BUCKETS = (2, 12, 48)                  # hours until departure
+HOUR_MULTS = (0.75, 0.35, 0.1, 0.0)
+
 def compute_dynamic_fare(base_fare: float, seats_total: int, seats_available: int, time_until_departure_hours: float, demand_level: int) -> float:
     """Compute dynamic fare based on heuristics:
     - remaining seat percentage: higher price when seats low
@@ -119,22 +177,10 @@ def compute_dynamic_fare(base_fare: float, seats_total: int, seats_available: in
     mult = 1.0
 
     # Remaining seats effect: exponential-ish
-    if remaining_pct < 0.05:
-        mult += 1.0  # +100%
-    elif remaining_pct < 0.15:
-        mult += 0.5  # +50%
-    elif remaining_pct < 0.33:
-        mult += 0.25
-    elif remaining_pct < 0.5:
-        mult += 0.1
+    mult += SEAT_MULTS[bisect_right(SEAT_BUCKETS, remaining_pct)]
 
     # Time to departure effect
-    if time_until_departure_hours < 2:
-        mult += 0.75
-    elif time_until_departure_hours < 12:
-        mult += 0.35
-    elif time_until_departure_hours < 48:
-        mult += 0.1
+    mult += HOUR_MULTS[bisect_right(HOUR_BUCKETS, time_until_departure_hours)]
 
     # Demand level effect (normalized between 0 and 1)
     demand_factor = max(0.0, min(1.0, demand_level / 100.0))
@@ -152,6 +198,69 @@ def compute_dynamic_fare(base_fare: float, seats_total: int, seats_available: in
     fare = max(floor, round(raw, 2))
     return fare
 
+def compute_dynamic_fare_vec(base_fare, seats_total, seats_available, time_until_departure_hours, demand_level) -> np.ndarray:
+    """Array version of compute_dynamic_fare for pricing many flights at once.
+    Takes equal-length array-likes and applies the same tiers, volatility and floor.
+    """
+    base_fare = np.asarray(base_fare, dtype=float)
+    seats_total = np.asarray(seats_total, dtype=float)
+    seats_available = np.asarray(seats_available, dtype=float)
+    hours = np.asarray(time_until_departure_hours, dtype=float)
+    demand_level = np.asarray(demand_level, dtype=float)
+
+    seats_total = np.where(seats_total <= 0, 1.0, seats_total)
+    remaining_pct = seats_available / seats_total
+
+    mult = 1.0 + np.take(SEAT_MULTS, np.searchsorted(SEAT_BUCKETS, remaining_pct, side="right"))
+    mult += np.take(HOUR_MULTS, np.searchsorted(HOUR_BUCKETS, hours, side="right"))
+    mult += np.clip(demand_level / 100.0, 0.0, 1.0) * 0.8
+
+    raw = base_fare * mult
+    raw *= 1.0 + np.random.uniform(-0.02, 0.03, size=raw.shape)
+
+    floor = np.maximum(1.0, base_fare * 0.5)
+    return np.maximum(floor, np.round(raw, 2))
+
+def hours_until(departures, now: datetime) -> np.ndarray:
+    """Hours from `now` until each departure (floored at 0.1), computed on a datetime64 array."""
+    delta = np.asarray(departures, dtype="datetime64[us]") - np.datetime64(now, "us")
+    return np.maximum(0.1, delta / np.timedelta64(1, "h"))
+
+# Fare history rows waiting to be written; request handlers enqueue, the background tick bulk-inserts.
+FARE_Q: queue.Queue = queue.Queue()
+
+def record_fares(flight_ids, fares, timestamp: datetime) -> None:
+    if ENABLE_FARE_HISTORY:
+        for fid, fare in zip(flight_ids, fares):
+            FARE_Q.put_nowait((fid, timestamp, fare))
+
+def drain_fare_queue() -> List[dict]:
+    rows = []
+    while True:
+        try:
+            fid, ts, fare = FARE_Q.get_nowait()
+        except queue.Empty:
+            break
+        rows.append({"flight_id": fid, "timestamp": ts, "fare": fare})
+    return rows
+
+def requeue_fare_rows(rows: List[dict]) -> None:
+    """Put drained rows back after a failed write so the next tick retries them."""
+    for r in rows:
+        FARE_Q.put_nowait((r["flight_id"], r["timestamp"], r["fare"]))
+
+def flush_fare_queue() -> None:
+    """Write everything still queued in one transaction (used on shutdown)."""
+    rows = drain_fare_queue()
+    if not rows:
+        return
+    try:
+        with Session(engine) as session, session.begin():
+            session.bulk_insert_mappings(FareHistory, rows)
+    except Exception:
+        requeue_fare_rows(rows)
+        raise
+
 # -------------------------------
 # Seed helper / external simulation
 # -------------------------------
@@ -183,6 +292,54 @@ def generate_sample_flight(airline: str, origin: str, destination: str, dep_date
     flight.current_fare = compute_dynamic_fare(flight.base_fare, flight.seats_total, flight.seats_available, max(0.1, hours), flight.demand_level)
     return flight
 
+def generate_sample_flights(specs: List[Tuple[str, str, str, date]]) -> List[Flight]:
+    """Batch version of generate_sample_flight for (airline, origin, destination, dep_date) tuples.
+    All random fields and initial fares are drawn as arrays in one pass.
+    """
+    n = len(specs)
+    if n == 0:
+        return []
+    airlines, origins, destinations, dep_dates = zip(*specs)
+    prefixes = {a: a[:2].upper() for a in set(airlines)}
+
+    departures = (
+        np.array(dep_dates, dtype="datetime64[D]").astype("datetime64[m]")
+        + np.random.randint(6, 23, size=n) * np.timedelta64(60, "m")
+        + np.random.choice([0, 15, 30, 45], size=n) * np.timedelta64(1, "m")
+    )
+    durations = np.random.randint(60, 301, size=n)
+    arrivals = departures + durations * np.timedelta64(1, "m")
+    seats_total = np.random.choice([120, 150, 180, 200], size=n)
+    seats_available = np.random.randint(0, seats_total + 1)
+    base_fares = np.round(np.random.uniform(2000, 15000, size=n), 2)
+    demand_levels = np.random.randint(0, 101, size=n)
+    codes = np.random.randint(100, 1000, size=n)
+
+    # compute initial fares
+    fares = compute_dynamic_fare_vec(base_fares, seats_total, seats_available, hours_until(departures, datetime.utcnow()), demand_levels)
+
+    return [
+        Flight(
+            flight_code=f"{prefixes[airline]}{code}",
+            airline=airline,
+            origin=origin,
+            destination=destination,
+            departure=dep,
+            arrival=arr,
+            duration_mins=duration,
+            seats_total=total,
+            seats_available=available,
+            base_fare=base_fare,
+            current_fare=fare,
+            demand_level=demand,
+        )
+        for airline, origin, destination, dep, arr, duration, total, available, base_fare, fare, demand, code in zip(
+            airlines, origins, destinations, departures.tolist(), arrivals.tolist(), durations.tolist(),
+            seats_total.tolist(), seats_available.tolist(), base_fares.tolist(), fares.tolist(),
+            demand_levels.tolist(), codes.tolist(),
+        )
+    ]
+
 # -------------------------------
 # API: External simulated endpoints
 # -------------------------------
@@ -191,29 +348,25 @@ def fetch_external_schedules(req: ExternalFlightRequest):
     """Simulate fetching flight schedules from external airline APIs and save them into DB.
     Returns the newly created flights (as a simple simulation).
     """
-    created = []
-    with Session(engine) as session:
-        for airline in req.airlines:
-            for route in req.routes:
-                origin, dest = route[0], route[1]
-                f = generate_sample_flight(airline, origin, dest, req.date)
-                session.add(f)
-                session.commit()
-                session.refresh(f)
-                if ENABLE_FARE_HISTORY:
-                    session.add(FareHistory(flight_id=f.id, timestamp=datetime.utcnow(), fare=f.current_fare))
-                created.append(f)
+    created = generate_sample_flights([
+        (airline, route[0], route[1], req.travel_date) for airline in req.airlines for route in req.routes
+    ])
+    # expire_on_commit=False: the new rows are used after commit, and expiring them would re-SELECT each one
+    with Session(engine, expire_on_commit=False) as session:
+        session.add_all(created)
         session.commit()
-    return [FlightOut(**c.dict()) for c in created]
+    record_fares([f.id for f in created], [f.current_fare for f in created], datetime.utcnow())
+    return [FlightOut.model_validate(c) for c in created]
 
-@app.get("/external/airline/{airline}")
+# no response_model here, so encode with orjson directly; the other routes are serialized by pydantic
+@app.get("/external/airline/{airline}", response_class=ORJSONResponse)
 def get_external_airline_schedule(airline: str, date_param: Optional[date] = None):
     """Return generated schedule for viewing (not persisted) to simulate external API response."""
     d = date_param or date.today()
     schedules = []
     for _ in range(3):
         f = generate_sample_flight(airline, random.choice(["DEL","BOM","BLR","MAA","HYD"]), random.choice(["DEL","BOM","BLR","MAA","HYD"]), d)
-        schedules.append(FlightOut(**f.dict()))
+        schedules.append(FlightOut.model_validate(f))
     return schedules
 
 # -------------------------------
@@ -222,9 +375,9 @@ def get_external_airline_schedule(airline: str, date_param: Optional[date] = Non
 @app.get("/flights", response_model=List[FlightOut])
 def get_all_flights(limit: int = Query(100, ge=1, le=1000)):
     with Session(engine) as session:
-        statement = select(Flight).limit(limit)
-        results = session.exec(statement).all()
-    return [FlightOut(**r.dict()) for r in results]
+        statement = select(*FLIGHT_OUT_COLUMNS).limit(limit)
+        rows = session.execute(statement).mappings().all()
+    return [FlightOut(**r) for r in rows]
 
 @app.get("/search", response_model=List[FlightOut])
 def search_flights(
@@ -237,6 +390,8 @@ def search_flights(
 ):
     """Search flights by origin, destination, and date.
     Sorting can be done by price or duration. Price refers to dynamic current_fare.
+    Sorting and limiting happen in SQL; price order uses the stored current_fare,
+    which the background worker refreshes on every tick.
     """
     with Session(engine) as session:
         stmt = select(Flight)
@@ -250,87 +405,114 @@ def search_flights(
             end_dt = start_dt + timedelta(days=1)
             stmt = stmt.where(Flight.departure >= start_dt, Flight.departure < end_dt)
 
-        results = session.exec(stmt).all()
-
-        # Recompute dynamic fares at search time for each result
-        adjusted = []
-        for f in results:
-            hours = (f.departure - datetime.utcnow()).total_seconds() / 3600
-            new_fare = compute_dynamic_fare(f.base_fare, f.seats_total, f.seats_available, max(0.1, hours), f.demand_level)
-            f.current_fare = new_fare
-            if ENABLE_FARE_HISTORY:
-                session.add(FareHistory(flight_id=f.id, timestamp=datetime.utcnow(), fare=new_fare))
-            adjusted.append(f)
-        session.commit()
+        sort_col = Flight.current_fare if sort_by == 'price' else Flight.duration_mins
+        stmt = stmt.order_by(sort_col.desc() if order == 'desc' else sort_col.asc()).limit(limit)
 
-    # Sorting
-    reverse = (order == 'desc')
-    if sort_by == 'price':
-        adjusted.sort(key=lambda x: x.current_fare, reverse=reverse)
-    else:
-        adjusted.sort(key=lambda x: x.duration_mins, reverse=reverse)
+        # read-only: fares and fare history are written by the background worker only
+        results = session.exec(stmt).all()
 
-    return [FlightOut(**f.dict()) for f in adjusted[:limit]]
+    return [FlightOut.model_validate(f) for f in results]
 
 # -------------------------------
 # Background simulation: demand and availability changes
 # -------------------------------
-stop_background = False
-
-def background_worker():
-    """Runs in a separate thread. Periodically updates demand levels, seat availability and prices."""
-    global stop_background
+stop_background: Optional[asyncio.Event] = None
+bg_task: Optional[asyncio.Task] = None
+
+def run_update_tick():
+    """One simulation step: updates demand levels, seat availability and prices for all flights."""
+    queued_rows = []
+    history_rows = []
+    try:
+        with Session(engine) as session, session.begin():
+            # plain column tuples: no ORM objects to hydrate or track
+            rows = session.execute(select(
+                Flight.id, Flight.base_fare, Flight.seats_total,
+                Flight.seats_available, Flight.departure, Flight.demand_level,
+            )).all()
+            now = datetime.utcnow()
+            if rows:
+                ids, base_fares, seats_total, seats_available, departures, demand_levels = zip(*rows)
+                n = len(ids)
+                seats_total = np.array(seats_total)
+
+                # Simulate demand: small random walk
+                demand_levels = np.clip(np.array(demand_levels) + np.random.randint(-5, 9, size=n), 0, 100)
+
+                # Simulate seats booking/cancellation
+                change = np.random.choice([0, -1, -2, 1], p=[0.70, 0.15, 0.05, 0.10], size=n)
+                seats_available = np.clip(np.array(seats_available) + change, 0, seats_total)
+
+                # Recompute fares for every flight in one vectorized call
+                hours = hours_until(departures, now)
+                fares = compute_dynamic_fare_vec(base_fares, seats_total, seats_available, hours, demand_levels)
+
+                updates = [
+                    {"id": fid, "demand_level": dl, "seats_available": sa, "current_fare": fare}
+                    for fid, dl, sa, fare in zip(ids, demand_levels.tolist(), seats_available.tolist(), fares.tolist())
+                ]
+                session.bulk_update_mappings(Flight, updates)
+                if ENABLE_FARE_HISTORY:
+                    history_rows = [{"flight_id": u["id"], "timestamp": now, "fare": u["current_fare"]} for u in updates]
+
+            # write this tick's fares plus everything queued by requests since the last tick in one INSERT
+            queued_rows.extend(drain_fare_queue())
+            history_rows.extend(queued_rows)
+            if history_rows:
+                session.bulk_insert_mappings(FareHistory, history_rows)
+    except Exception:
+        # the transaction rolled back; keep the request-queued history for the next tick
+        requeue_fare_rows(queued_rows)
+        raise
+
+async def background_loop(stop: asyncio.Event):
+    """Runs on the app's event loop. Each tick is pushed to a worker thread so DB work never blocks requests.
+    Setting `stop` ends the wait between ticks early; a tick already running is allowed to finish.
+    """
     print("[Background] Worker started")
-    while not stop_background:
+    while not stop.is_set():
         try:
-            with Session(engine) as session:
-                flights = session.exec(select(Flight)).all()
-                for f in flights:
-                    # Simulate demand: small random walk
-                    delta = random.randint(-5, 8)
-                    f.demand_level = max(0, min(100, f.demand_level + delta))
-
-                    # Simulate seats booking/cancellation
-                    change = random.choices([0, -1, -2, 1], weights=[70,15,5,10])[0]
-                    f.seats_available = max(0, min(f.seats_total, f.seats_available + change))
-
-                    # Recompute fare
-                    hours = (f.departure - datetime.utcnow()).total_seconds() / 3600
-                    f.current_fare = compute_dynamic_fare(f.base_fare, f.seats_total, f.seats_available, max(0.1, hours), f.demand_level)
-
-                    if ENABLE_FARE_HISTORY:
-                        session.add(FareHistory(flight_id=f.id, timestamp=datetime.utcnow(), fare=f.current_fare))
-
-                session.commit()
+            await asyncio.wait_for(stop.wait(), timeout=BACKGROUND_UPDATE_INTERVAL_SEC)
+            break
+        except asyncio.TimeoutError:
+            pass
+        try:
+            await asyncio.to_thread(run_update_tick)
         except Exception as e:
             print("[Background] Exception:", e)
-        time.sleep(BACKGROUND_UPDATE_INTERVAL_SEC)
     print("[Background] Worker stopped")
 
-bg_thread = threading.Thread(target=background_worker, daemon=True)
-
-@app.on_event("startup")
-def startup_event():
-    # Seed DB with some flights if empty
+def seed_sample_flights():
+    """Seed DB with some flights if empty."""
     with Session(engine) as session:
-        count = session.exec(select(Flight)).count()
-        if count == 0:
+        if session.exec(select(Flight.id).limit(1)).first() is None:
             print("Seeding sample flights...")
             today = date.today()
-            for airline in ["AirFast","SkyLine","CloudAir"]:
-                for route in [["DEL","BOM"],["DEL","BLR"],["BLR","BOM"]]:
-                    f = generate_sample_flight(airline, route[0], route[1], today + timedelta(days=random.randint(0,5)))
-                    session.add(f)
+            session.add_all(generate_sample_flights([
+                (airline, route[0], route[1], today + timedelta(days=random.randint(0,5)))
+                for airline in ["AirFast","SkyLine","CloudAir"]
+                for route in [["DEL","BOM"],["DEL","BLR"],["BLR","BOM"]]
+            ]))
             session.commit()
+
+@app.on_event("startup")
+async def startup_event():
+    global bg_task, stop_background
+    if SEED_SAMPLE_DATA:
+        seed_sample_flights()
     # start background worker
-    if not bg_thread.is_alive():
-        bg_thread.start()
+    if bg_task is None or bg_task.done():
+        stop_background = asyncio.Event()
+        bg_task = asyncio.create_task(background_loop(stop_background))
 
 @app.on_event("shutdown")
-def shutdown_event():
-    global stop_background
-    stop_background = True
-    bg_thread.join(timeout=2)
+async def shutdown_event():
+    if bg_task is not None:
+        stop_background.set()
+        # wait for an in-flight tick so its requeued rows (if it fails) are seen by the final flush
+        await bg_task
+    # persist fare history still waiting for a tick
+    flush_fare_queue()
 
 # -------------------------------
 # Utility: Optional endpoints for admin actions
@@ -3,7 +3,7 @@ from datetime import datetime
 
 class Flight(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    flight_number = db.Column(db.String(20), unique=True)
+    flight_number = db.Column(db.String(20), unique=True, index=True)
     source = db.Column(db.String(50))
     destination = db.Column(db.String(50))
     departure_time = db.Column(db.String(30))
@@ -23,9 +23,9 @@ class Flight(db.Model):
 
 class Booking(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    pnr = db.Column(db.String(10), unique=True)
+    pnr = db.Column(db.String(10), unique=True, index=True)
     passenger_name = db.Column(db.String(100))
-    flight_id = db.Column(db.Integer, db.ForeignKey('flight.id'))
+    flight_id = db.Column(db.Integer, db.ForeignKey('flight.id'), index=True)
     seats_booked = db.Column(db.Integer)
     total_amount = db.Column(db.Float)
     status = db.Column(db.String(20), default='CONFIRMED')
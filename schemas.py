@@ -0,0 +1,30 @@
+from datetime import datetime
+from typing import List, Optional
+from typing_extensions import Annotated, TypedDict
+
+from pydantic import PlainSerializer, TypeAdapter
+
+
+class FlightDict(TypedDict):
+    id: int
+    flight_number: str
+    source: str
+    destination: str
+    departure_time: str
+    available_seats: int
+    price: float
+
+
+class BookingDict(TypedDict):
+    pnr: str
+    passenger_name: Optional[str]
+    flight_id: int
+    seats_booked: int
+    total_amount: float
+    status: str
+    created_at: Annotated[datetime, PlainSerializer(lambda d: d.strftime('%Y-%m-%d %H:%M'), return_type=str)]
+
+
+# Serialize whole result lists to JSON bytes in one call
+FLIGHTS_ADAPTER = TypeAdapter(List[FlightDict])
+BOOKINGS_ADAPTER = TypeAdapter(List[BookingDict])